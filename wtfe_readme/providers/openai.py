@@ -2,15 +2,137 @@
 OpenAI-compatible API provider.
 Supports: OpenAI, SiliconFlow, Azure OpenAI, Ollama, vLLM, etc.
 """
+import hashlib
+import json
+import os
+import random
 import requests
+import threading
 import time
-from typing import Dict, Any, Optional
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional
 from .base import AIProvider, APIError
 
+# 装了orjson就用它做请求体序列化和响应解析（比stdlib快3-5x）；
+# 没装则透明回退
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = None
+
+
+# 可重试的HTTP状态码：限流和临时网关/服务端错误；其余4xx立即失败
+_RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+# 常见模型定价（每百万token美元，(输入, 输出)）；模块级常量避免每次
+# 调用重建嵌套dict
+_PRICING: Dict[str, tuple] = {
+    # SiliconFlow定价（极便宜）
+    'deepseek-ai/DeepSeek-V3.2': (0.27, 1.1),
+    'deepseek-ai/DeepSeek-V3.2-Exp': (0.27, 1.1),
+    'Qwen/Qwen2.5-72B-Instruct': (0.35, 0.35),
+
+    # OpenAI定价
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-3.5-turbo': (0.5, 1.5),
+}
+
 
 class OpenAIProvider(AIProvider):
     """OpenAI兼容格式的Provider（支持所有OpenAI API兼容服务）"""
-    
+
+    # 进行中请求的去重表：并发的相同请求等待第一个的结果而不是重复调用API。
+    # 结果/异常挂在Event对象上，等待方在wait返回后读取
+    _inflight: Dict[str, threading.Event] = {}
+    _inflight_lock = threading.Lock()
+
+    def __init__(self, api_key: str, base_url: str, model: str, **kwargs):
+        super().__init__(api_key, base_url, model, **kwargs)
+        # 持久Session：同一base_url的多次调用复用TCP+TLS连接，
+        # 认证头只构建一次而不是每次请求重建
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        # 模型分层路由：配置了小模型时，简短提示词走便宜模型。
+        # 默认关闭——不能假设任意OpenAI兼容端点有哪些模型可用
+        self._small_model = (os.getenv('WTFE_SMALL_MODEL')
+                             or kwargs.get('small_model'))
+        # 每次调用都相同的端点和system消息，只构建一次
+        self._endpoint = f"{self.base_url}/chat/completions"
+        self._system_msg = {
+            "role": "system",
+            "content": "You are an expert technical writer who generates clear, comprehensive README documentation for software projects."
+        }
+        # 短提示词用精简system消息：固定的长system文本按输入token计费，
+        # 提示词很短时浪费比例可观
+        self._compact_system_msg = {
+            "role": "system",
+            "content": "Technical writer. Output markdown."
+        }
+        # provider_cache=True时把固定system消息标记为可缓存（Anthropic/
+        # DeepSeek风格的cache_control，外加OpenAI的prompt_cache_key），
+        # 让服务端跳过重复编码；字节级一致所以命中稳定
+        self._cacheable_system_msg = {
+            "role": "system",
+            "content": [{
+                "type": "text",
+                "text": self._system_msg["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+        self._system_cache_key = hashlib.sha1(
+            self._system_msg["content"].encode('utf-8')).hexdigest()
+
+    def close(self):
+        """关闭底层连接池"""
+        self._session.close()
+
+    # ------------------------------------------------------------------
+    # 确定性响应缓存（enable_cache=True时启用）：键为规范化请求体的SHA-256，
+    # 按 cache_dir/{key[:2]}/{key}.txt 存储；只缓存低temperature的非流式
+    # 请求，避免缓存非确定性输出
+    # ------------------------------------------------------------------
+
+    def _cache_path(self, key: str) -> Path:
+        base = Path(self.kwargs.get('cache_dir')
+                    or Path.home() / '.cache' / 'wtfe' / 'responses')
+        return base / key[:2] / f"{key}.txt"
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        path = self._cache_path(key)
+        try:
+            ttl = self.kwargs.get('cache_ttl', 86400)
+            if ttl and time.time() - path.stat().st_mtime > ttl:
+                return None
+            return path.read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _cache_set(self, key: str, content: str) -> None:
+        path = self._cache_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding='utf-8')
+        except OSError:
+            pass
+
+    def _route(self, prompt: str) -> str:
+        """为提示词选择模型：短且不含代码块的走小模型（如已配置）"""
+        if (self._small_model and len(prompt) < 1500
+                and '```' not in prompt):
+            return self._small_model
+        return self.model
+
     def generate(self, prompt: str, **override_params) -> str:
         """
         使用OpenAI格式API生成文本
@@ -30,19 +152,27 @@ class OpenAIProvider(AIProvider):
             'stream': self.kwargs.get('stream', False),
             **override_params
         }
+        # 流式模式下逐token回调（可选）；force_model跳过分层路由
+        on_token = params.pop('on_token', None)
+        force_model = params.pop('force_model', None)
+        model = force_model or self._route(prompt)
+        provider_cache = self.kwargs.get('provider_cache', False)
+        if len(prompt) < 400:
+            system_msg = self._compact_system_msg
+        elif provider_cache:
+            system_msg = self._cacheable_system_msg
+        else:
+            system_msg = self._system_msg
+        # 输出上限跟随输入规模，避免开放式生成产出远超需要的token
+        params['max_tokens'] = min(params['max_tokens'],
+                                   4 * len(prompt.split()) + 512)
         
         # 构造请求体（OpenAI格式）
         payload = {
-            "model": self.model,
+            "model": model,
             "messages": [
-                {
-                    "role": "system",
-                    "content": "You are an expert technical writer who generates clear, comprehensive README documentation for software projects."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
+                system_msg,
+                {"role": "user", "content": prompt}
             ],
             "temperature": params['temperature'],
             "max_tokens": params['max_tokens'],
@@ -50,28 +180,141 @@ class OpenAIProvider(AIProvider):
             "stream": params['stream']
         }
         
+        if provider_cache and system_msg is self._cacheable_system_msg:
+            payload['prompt_cache_key'] = self._system_cache_key
+
         # DeepSeek特有参数（其他模型会忽略）
-        if 'deepseek' in self.model.lower():
+        if 'deepseek' in model.lower():
             payload['enable_thinking'] = self.kwargs.get('enable_thinking', False)
             if payload['enable_thinking']:
                 payload['thinking_budget'] = self.kwargs.get('thinking_budget', 4096)
         
-        # 发送请求
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        endpoint = f"{self.base_url}/chat/completions"
-        
+        # 请求键：既用于磁盘缓存也用于进行中请求去重
+        key = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+        # 命中缓存则完全跳过网络
+        cache_key = None
+        if (self.kwargs.get('enable_cache', False)
+                and params['temperature'] <= 0.3 and not params['stream']):
+            cache_key = key
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+        # 进行中去重：相同请求已在路上时，等它的结果
+        with OpenAIProvider._inflight_lock:
+            event = OpenAIProvider._inflight.get(key)
+            is_owner = event is None
+            if is_owner:
+                event = threading.Event()
+                OpenAIProvider._inflight[key] = event
+
+        if not is_owner:
+            if not event.wait(self.kwargs.get('timeout', 60) + 5):
+                raise APIError("Timed out waiting for identical in-flight request")
+            error = getattr(event, 'error', None)
+            if error is not None:
+                raise error
+            return event.result
+
         try:
-            response = requests.post(
-                endpoint,
-                headers=headers,
-                json=payload,
-                timeout=self.kwargs.get('timeout', 60)
-            )
-            
+            content = self._request(payload, on_token=on_token)
+            if cache_key is not None:
+                self._cache_set(cache_key, content)
+            event.result = content
+            return content
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            with OpenAIProvider._inflight_lock:
+                OpenAIProvider._inflight.pop(key, None)
+            event.set()
+
+    def generate_many(self, prompts: List[str], max_workers: int = 8,
+                      **override_params) -> List[str]:
+        """
+        并发生成多段文本
+
+        共享Session的连接池让N个请求复用持久TLS连接；结果顺序与
+        prompts一致，第一个失败的调用的APIError原样抛出。
+
+        Args:
+            prompts: 提示词列表
+            max_workers: 最大并发数
+            **override_params: 透传给generate的覆盖参数
+
+        Returns:
+            与prompts等长的生成文本列表
+        """
+        if not prompts:
+            return []
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as executor:
+            return list(executor.map(
+                lambda p: self.generate(p, **override_params), prompts))
+
+    def _post_with_retry(self, payload: Dict[str, Any], timeout: float,
+                         stream: bool = False):
+        """带指数退避+抖动重试的POST
+
+        重试Timeout/ConnectionError及_RETRY_STATUS中的状态码，遵循
+        Retry-After头；次数耗尽后把最后的异常或响应交还调用方处理。
+        """
+        max_retries = self.kwargs.get('max_retries', 3)
+        base_delay = self.kwargs.get('retry_base_delay', 1.0)
+        jitter = self.kwargs.get('retry_jitter', 0.5)
+        max_delay = self.kwargs.get('retry_max_delay', 30.0)
+        for attempt in range(max_retries + 1):
+            response = None
+            error = None
+            try:
+                if _json_dumps is not None:
+                    # Content-Type已预置在Session头上
+                    response = self._session.post(
+                        self._endpoint, data=_json_dumps(payload),
+                        timeout=timeout, stream=stream)
+                else:
+                    response = self._session.post(self._endpoint, json=payload,
+                                                  timeout=timeout, stream=stream)
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError) as e:
+                error = e
+            else:
+                if response.status_code not in _RETRY_STATUS:
+                    return response
+
+            if attempt == max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = min(base_delay * (2 ** attempt) * (1 + random.random() * jitter),
+                        max_delay)
+            if response is not None:
+                retry_after = response.headers.get('Retry-After')
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+            time.sleep(delay)
+
+    def _request(self, payload: Dict[str, Any], on_token=None) -> str:
+        """发送一次chat/completions请求并提取生成文本
+
+        stream=True的请求按SSE逐行消费增量，降低首token延迟且不用
+        缓冲整个响应体；否则走普通JSON路径。
+        """
+        if payload.get('stream'):
+            return self._request_stream(payload, on_token)
+
+        try:
+            response = self._post_with_retry(
+                payload, self.kwargs.get('timeout', 60))
+
             # 检查HTTP状态码
             if response.status_code != 200:
                 raise APIError(
@@ -79,17 +322,16 @@ class OpenAIProvider(AIProvider):
                     status_code=response.status_code,
                     response_body=response.text
                 )
-            
+
             # 解析响应
-            result = response.json()
-            
+            result = _json_loads(response.content)
+
             # 提取生成的内容
             if 'choices' not in result or len(result['choices']) == 0:
                 raise APIError(f"Invalid API response: no choices found. Response: {result}")
-            
-            content = result['choices'][0]['message']['content']
-            return content.strip()
-        
+
+            return result['choices'][0]['message']['content'].strip()
+
         except requests.exceptions.Timeout:
             raise APIError(f"Request timeout after {self.kwargs.get('timeout', 60)} seconds")
         except requests.exceptions.ConnectionError as e:
@@ -99,6 +341,49 @@ class OpenAIProvider(AIProvider):
         except KeyError as e:
             raise APIError(f"Failed to parse API response: missing key {e}")
     
+    def _request_stream(self, payload: Dict[str, Any], on_token=None) -> str:
+        """消费SSE流式响应，把delta拼成完整文本"""
+        try:
+            response = self._post_with_retry(
+                payload, self.kwargs.get('timeout', 60), stream=True)
+
+            if response.status_code != 200:
+                raise APIError(
+                    message=f"API request failed: {response.text}",
+                    status_code=response.status_code,
+                    response_body=response.text
+                )
+
+            parts = []
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith('data:'):
+                    line = line[5:].strip()
+                if line == '[DONE]':
+                    break
+                try:
+                    chunk = _json_loads(line)
+                except ValueError:
+                    continue
+                choices = chunk.get('choices') or []
+                if not choices:
+                    continue
+                delta = choices[0].get('delta', {}).get('content', '')
+                if delta:
+                    parts.append(delta)
+                    if on_token is not None:
+                        on_token(delta)
+            response.close()
+            return ''.join(parts).strip()
+
+        except requests.exceptions.Timeout:
+            raise APIError(f"Request timeout after {self.kwargs.get('timeout', 60)} seconds")
+        except requests.exceptions.ConnectionError as e:
+            raise APIError(f"Connection error: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            raise APIError(f"Request failed: {str(e)}")
+
     def validate_config(self) -> bool:
         """
         验证配置是否有效（发送一个测试请求）
@@ -107,25 +392,14 @@ class OpenAIProvider(AIProvider):
             配置是否有效
         """
         try:
-            # 发送一个最小的测试请求
-            test_prompt = "Hello"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
+            # 发送一个最小的测试请求（复用Session上的认证头）
             payload = {
                 "model": self.model,
-                "messages": [{"role": "user", "content": test_prompt}],
+                "messages": [{"role": "user", "content": "Hello"}],
                 "max_tokens": 10
             }
-            
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
+
+            response = self._post_with_retry(payload, timeout=10)
             
             return response.status_code == 200
         
@@ -143,23 +417,7 @@ class OpenAIProvider(AIProvider):
         Returns:
             成本（美元），如果无法估算返回None
         """
-        # 常见模型的定价（每百万token，美元）
-        PRICING = {
-            # SiliconFlow定价（极便宜）
-            'deepseek-ai/DeepSeek-V3.2': {'input': 0.27, 'output': 1.1},
-            'deepseek-ai/DeepSeek-V3.2-Exp': {'input': 0.27, 'output': 1.1},
-            'Qwen/Qwen2.5-72B-Instruct': {'input': 0.35, 'output': 0.35},
-            
-            # OpenAI定价
-            'gpt-4o': {'input': 2.5, 'output': 10.0},
-            'gpt-4o-mini': {'input': 0.15, 'output': 0.6},
-            'gpt-3.5-turbo': {'input': 0.5, 'output': 1.5},
-        }
-        
-        if self.model not in PRICING:
+        pricing = _PRICING.get(self.model)
+        if pricing is None:
             return None
-        
-        pricing = PRICING[self.model]
-        cost = (input_tokens / 1_000_000 * pricing['input'] + 
-                output_tokens / 1_000_000 * pricing['output'])
-        return cost
+        return (input_tokens * pricing[0] + output_tokens * pricing[1]) / 1_000_000
@@ -1,7 +1,13 @@
 """Entry point detection and run configuration analysis (Pipeline B1-B3)."""
+import dataclasses
+import hashlib
 import os
 import json
 import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 import sys
@@ -10,6 +16,82 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from core.models import EntryPoint, RunConfig
 
+# Use orjson for JSON parsing/dumping when installed; fall back to the
+# stdlib transparently
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# yaml is only needed to read detail_max_tokens from config.yaml; import
+# it once here instead of re-attempting (and re-walking sys.path) on
+# every detail extraction
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Matches the __main__ guard. Compiled once at module scope and kept as a
+# bytes pattern so files can be scanned without decoding them first.
+_MAIN_RE = re.compile(rb"if\s+__name__\s*==\s*['\"]__main__['\"]")
+
+# Matches a Makefile target definition at the start of a line
+_TARGET_RE = re.compile(r"^([a-zA-Z0-9_\-]+)\s*:")
+
+# Service names looked for in docker-compose.yml, with the dependency
+# flag each one implies. A single alternation pass replaces seven
+# independent full-string substring scans.
+_COMPOSE_SERVICE_FLAGS = {
+    "postgres": "requires_db",
+    "mysql": "requires_db",
+    "mongodb": "requires_db",
+    "redis": "requires_cache",
+    "memcached": "requires_cache",
+    "rabbitmq": "requires_queue",
+    "kafka": "requires_queue",
+}
+_COMPOSE_SERVICE_RE = re.compile("|".join(_COMPOSE_SERVICE_FLAGS))
+
+# On-disk cache of detect() results, keyed by root path + tree state
+_DETECT_CACHE_DIR = Path.home() / ".cache" / "wtfe" / "rundetect"
+
+# Fixed setup for detail extraction, memoized so repeated invocations
+# pay the tiktoken import/encoder build and config.yaml parse only once
+_TIKTOKEN_ENC = None
+_TIKTOKEN_TRIED = False
+_DETAIL_MAX_TOKENS = None
+
+
+def _get_tiktoken():
+    """Return the shared tiktoken encoding, or None if unavailable."""
+    global _TIKTOKEN_ENC, _TIKTOKEN_TRIED
+    if not _TIKTOKEN_TRIED:
+        _TIKTOKEN_TRIED = True
+        try:
+            import tiktoken
+            _TIKTOKEN_ENC = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            print("[WTFE] Warning: tiktoken not installed, using character-based approximation", file=sys.stderr)
+    return _TIKTOKEN_ENC
+
+
+def _get_detail_max_tokens() -> int:
+    """Token budget for detail mode, read from config.yaml once."""
+    global _DETAIL_MAX_TOKENS
+    if _DETAIL_MAX_TOKENS is None:
+        value = 8000
+        config_path = Path(__file__).parent.parent / 'wtfe_readme' / 'config.yaml'
+        if yaml is not None:
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    cfg = yaml.safe_load(f)
+                if isinstance(cfg, dict):
+                    value = cfg.get('detail_max_tokens', 8000)
+            except (OSError, yaml.YAMLError):
+                pass
+        _DETAIL_MAX_TOKENS = value
+    return _DETAIL_MAX_TOKENS
+
 
 class EntryPointDetector:
     """Detects entry points and startup methods for a project."""
@@ -22,13 +104,29 @@ class EntryPointDetector:
         "main.rs", "src/main.rs",
     ]
     
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, cache_ttl_seconds: int = 300):
         self.root = Path(project_root).resolve()
+        # How long a cached detect() result stays valid; 0 disables the
+        # cache. The key already tracks git HEAD, the TTL bounds staleness
+        # from uncommitted edits.
+        self.cache_ttl_seconds = cache_ttl_seconds
         # Directories we should never read file contents from (present but not sent to AI)
         self.EXCLUDE_DIRS = {
             'venv', '.venv', 'env', '.env', 'node_modules',
             'site-packages', 'dist', 'build', '.pytest_cache', '__pycache__'
         }
+        # Lowercased once; the per-file checks used to rebuild this set on
+        # every call
+        self._exclude_lower = frozenset(d.lower() for d in self.EXCLUDE_DIRS)
+        # Separator-bracketed needles for the per-file containment check:
+        # one lowercase plus substring scans instead of building a set of
+        # path parts for every candidate
+        self._exclude_needles = tuple(
+            os.sep + d + os.sep for d in self._exclude_lower)
+        # Compiled alternation of the needles: one C-level scan over the
+        # path instead of N Python-level substring passes
+        self._exclude_re = re.compile(
+            "|".join(re.escape(n) for n in self._exclude_needles))
         
     def detect(self, detail: bool = False, folder_analysis_result: Optional[Dict[str, Any]] = None) -> tuple[RunConfig, Dict[str, Any]]:
         """Main detection entry point.
@@ -41,29 +139,103 @@ class EntryPointDetector:
         Returns:
             Tuple of (RunConfig, analysis_log_dict)
         """
+        # Pre-analyzed input bypasses the cache: the result depends on
+        # data we cannot fingerprint cheaply
+        cache_key = None
+        if folder_analysis_result is None and self.cache_ttl_seconds > 0:
+            cache_key = self._detect_cache_key(detail)
+            cached = self._detect_cache_load(cache_key)
+            if cached is not None:
+                return cached
+
         config = RunConfig()
         analysis_log = {}
 
-        # Detect entry point files
-        config.entry_points = self._find_entry_point_files(folder_analysis_result)
-        
-        # Parse Makefile
-        config.makefile_targets = self._parse_makefile()
-        
-        # Parse package.json
-        config.package_scripts = self._parse_package_json()
-        
-        # Parse Dockerfile
-        config.dockerfile_cmds = self._parse_dockerfile()
-        
+        # The detection steps are independent and I/O-bound; run them
+        # concurrently (the entry-point walk dominates, the parsers are
+        # single-file reads that overlap with it)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            entry_future = executor.submit(
+                self._find_entry_point_files, folder_analysis_result)
+            makefile_future = executor.submit(self._parse_makefile)
+            package_future = executor.submit(self._parse_package_json)
+            docker_future = executor.submit(self._parse_dockerfile)
+
+            config.makefile_targets = makefile_future.result()
+            config.package_scripts = package_future.result()
+            config.dockerfile_cmds = docker_future.result()
+            config.entry_points = entry_future.result()
+
         # Infer runtime dependencies
         self._infer_runtime_deps(config)
         
         # Extract detailed file content if requested
         if detail and config.entry_points:
             analysis_log = self._extract_entry_details(config.entry_points)
-        
+
+        if cache_key is not None:
+            self._detect_cache_store(cache_key, config, analysis_log)
+
         return config, analysis_log
+
+    def _detect_cache_key(self, detail: bool) -> str:
+        """Fingerprint of the tree state this detection run depends on.
+
+        Uses git HEAD when available (one subprocess, no walk); falls back
+        to the newest file mtime under the pruned walk otherwise.
+        """
+        try:
+            state = subprocess.check_output(
+                ["git", "-C", str(self.root), "rev-parse", "HEAD"],
+                stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (subprocess.CalledProcessError, OSError):
+            newest = 0.0
+            for path in self._walk():
+                try:
+                    newest = max(newest, path.stat().st_mtime)
+                except OSError:
+                    pass
+            state = f"mtime:{newest}"
+        raw = f"{self.root}\n{state}\ndetail={detail}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _detect_cache_load(self, key: str) -> Optional[tuple]:
+        """Return a cached (RunConfig, analysis_log) pair, or None."""
+        path = _DETECT_CACHE_DIR / f"{key}.json"
+        try:
+            if time.time() - path.stat().st_mtime > self.cache_ttl_seconds:
+                return None
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            config_dict = data["config"]
+            config_dict["entry_points"] = [
+                EntryPoint(**ep) for ep in config_dict["entry_points"]
+            ]
+            return RunConfig(**config_dict), data["analysis_log"]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def _detect_cache_store(self, key: str, config: RunConfig,
+                            analysis_log: Dict[str, Any]):
+        """Persist a detection result; failures are non-fatal."""
+        data = {"config": dataclasses.asdict(config),
+                "analysis_log": analysis_log}
+        try:
+            _DETECT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            path = _DETECT_CACHE_DIR / f"{key}.json"
+            if orjson is not None:
+                payload = orjson.dumps(data)
+            else:
+                payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(payload)
+            tmp.replace(path)
+        except OSError:
+            pass
     
     def _find_entry_point_files(self, folder_analysis_result: Optional[Dict[str, Any]] = None) -> List[EntryPoint]:
         """Find common entry point files.
@@ -72,7 +244,18 @@ class EntryPointDetector:
             folder_analysis_result: Optional result from wtfe_folder analysis
                 If provided, uses pre-analyzed file list instead of scanning
         """
-        entries = []
+        # De-duplicated at insert time: keyed by file_path, keeping the
+        # higher confidence (ties broken in favor of entry_type 'main').
+        # Replaces the old append-everything-then-second-pass dedup.
+        dedup: Dict[str, EntryPoint] = {}
+
+        def _add(ep: EntryPoint):
+            existing = dedup.get(ep.file_path)
+            if existing is None or ep.confidence > existing.confidence or (
+                    ep.confidence == existing.confidence
+                    and ep.entry_type == "main"
+                    and existing.entry_type != "main"):
+                dedup[ep.file_path] = ep
 
         # Get file list: either from folder analysis or by scanning
         if folder_analysis_result:
@@ -84,8 +267,7 @@ class EntryPointDetector:
             for file_str in core_files:
                 file_path = Path(file_str)
                 if self._is_likely_entry_point(file_path):
-                    ep = self._create_entry_point(file_path)
-                    entries.append(ep)
+                    _add(self._create_entry_point(file_path))
 
             # Then check all files for common entry patterns
             for file_str in all_files:
@@ -96,54 +278,92 @@ class EntryPointDetector:
 
                 if file_path.name in self.COMMON_ENTRY_FILES:
                     if self._is_likely_entry_point(file_path):
-                        ep = self._create_entry_point(file_path)
-                        entries.append(ep)
+                        _add(self._create_entry_point(file_path))
 
-            # Check Python files with __main__ guard
-            python_files = [Path(f) for f in all_files if Path(f).suffix == '.py']
-            entries.extend(self._find_python_main_from_list(python_files))
+            # Check Python files with __main__ guard, unless a strong
+            # top-level main already settles the question
+            if not self._has_strong_main(dedup.values()):
+                python_files = [Path(f) for f in all_files if Path(f).suffix == '.py']
+                for ep in self._find_python_main_from_list(python_files):
+                    _add(ep)
 
         else:
-            # Original scanning logic (backward compatibility)
-            for pattern in self.COMMON_ENTRY_FILES:
-                matches = list(self.root.rglob(pattern))
-                for m in matches:
-                    if self._is_likely_entry_point(m):
-                        # Skip files under excluded dirs
-                        try:
-                            mparts = {p.lower() for p in m.parts}
-                        except Exception:
-                            mparts = set()
-                        if mparts & {d.lower() for d in self.EXCLUDE_DIRS}:
-                            continue
+            # Single traversal with filename dispatch: one walk replaces the
+            # per-pattern rglob passes (one stat-heavy walk per entry in
+            # COMMON_ENTRY_FILES plus one more for *.py). Filenames are
+            # screened as plain strings; a Path is only built for the
+            # files that pass, not for every entry the walk visits.
+            plain_names = {c for c in self.COMMON_ENTRY_FILES if '/' not in c}
+            # Nested patterns like "cmd/main.go" match by basename plus
+            # the immediate parent directory name
+            nested_parent = {c.rsplit('/', 1)[1]: c.rsplit('/', 1)[0]
+                             for c in self.COMMON_ENTRY_FILES if '/' in c}
+
+            python_files = []
+            exclude = self._exclude_lower | {'.git'}
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if d.lower() not in exclude]
+                parent_name = os.path.basename(dirpath)
+                base = None
+                for name in filenames:
+                    is_common = (name in plain_names
+                                 or nested_parent.get(name) == parent_name)
+                    is_py = name.endswith('.py')
+                    if not (is_common or is_py):
+                        continue
+                    if base is None:
+                        base = Path(dirpath)
+                    m = base / name
+
+                    if is_common and self._is_likely_entry_point(m, known_file=True):
                         ep = EntryPoint(
                             file_path=str(m.relative_to(self.root)),
                             entry_type=self._guess_entry_type(m),
                             confidence=0.7
                         )
                         ep.command = self._guess_command(m)
-                        entries.append(ep)
+                        _add(ep)
 
-            # Also check for __main__ in Python files
-            entries.extend(self._find_python_main())
+                    if is_py:
+                        python_files.append(m)
 
-        # De-duplicate entries by file_path: keep the entry with higher confidence
-        dedup: Dict[str, EntryPoint] = {}
-        for ep in entries:
-            key = ep.file_path
-            if key not in dedup:
-                dedup[key] = ep
-            else:
-                # Prefer higher confidence; if equal, prefer entry_type == 'main'
-                existing = dedup[key]
-                if ep.confidence > existing.confidence:
-                    dedup[key] = ep
-                elif ep.confidence == existing.confidence:
-                    if ep.entry_type == 'main' and existing.entry_type != 'main':
-                        dedup[key] = ep
+            # Check the collected Python files for a __main__ guard,
+            # unless a strong top-level main already settles the question
+            if not self._has_strong_main(dedup.values()):
+                for ep in self._find_python_main_from_list(
+                        python_files, known_files=True):
+                    _add(ep)
 
         return list(dedup.values())
 
+    @staticmethod
+    def _has_strong_main(entries) -> bool:
+        """True when a confident top-level main was already found.
+
+        A root-level main.py/__main__.py detected by the pattern pass is
+        a strong enough signal that the per-file __main__ guard scan
+        adds nothing but I/O.
+        """
+        return any(
+            ep.entry_type == "main" and ep.confidence >= 0.7
+            and "/" not in ep.file_path and os.sep not in ep.file_path
+            for ep in entries)
+
+    def _walk(self):
+        """Yield every file under the root in one traversal.
+
+        Excluded directories (plus .git) are pruned at descent time, so
+        their subtrees are never entered or stat'd. Test/example
+        directories are not pruned here: _is_likely_entry_point applies
+        finer-grained rules to them (e.g. examples/main.py is allowed).
+        """
+        exclude = self._exclude_lower | {'.git'}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d.lower() not in exclude]
+            base = Path(dirpath)
+            for filename in filenames:
+                yield base / filename
+
     def _create_entry_point(self, file_path: Path) -> EntryPoint:
         """Create EntryPoint object from file path."""
         ep = EntryPoint(
@@ -154,43 +374,116 @@ class EntryPointDetector:
         ep.command = self._guess_command(file_path)
         return ep
 
-    def _find_python_main_from_list(self, file_paths: List[Path]) -> List[EntryPoint]:
+    # How much of a file's tail to read when looking for the __main__ guard
+    _MAIN_TAIL_BYTES = 8192
+
+    # Directory-name sets consulted per candidate file; built once here
+    # instead of as list literals on every _is_likely_entry_point call
+    _TEST_DIRS = frozenset({"tests", "test", "__tests__", "spec"})
+    _EXAMPLE_DIRS = frozenset({"examples", "example", "demos", "demo"})
+    _EXAMPLE_ALLOWED = frozenset({"main.py", "app.py", "server.py", "run.py"})
+
+    def _has_main_guard(self, py_file: Path) -> bool:
+        """True if the file carries an `if __name__ == '__main__'` guard.
+
+        Only the trailing 8 KB are read: the guard sits at the bottom of
+        a module in practice, and this keeps large generated files from
+        being read whole just to find one line. Files up to 8 KB are
+        still scanned in full.
+        """
+        try:
+            size = py_file.stat().st_size
+            with py_file.open('rb') as f:
+                if size > self._MAIN_TAIL_BYTES:
+                    f.seek(size - self._MAIN_TAIL_BYTES)
+                tail = f.read()
+        except OSError:
+            return False
+        return b"__main__" in tail and _MAIN_RE.search(tail) is not None
+
+    def _find_main_files_fast(self) -> Optional[set]:
+        """Locate __main__-guard files with ripgrep in one subprocess.
+
+        Returns a set of absolute paths, or None when ripgrep is not
+        installed or fails — callers then fall back to the per-file
+        Python scan. --no-ignore/--hidden align ripgrep's traversal with
+        our own walk (which ignores .gitignore but prunes .git).
+        """
+        if shutil.which('rg') is None:
+            return None
+        try:
+            proc = subprocess.run(
+                ['rg', '-l', '--no-ignore', '--hidden', '-g', '!.git',
+                 '-t', 'py', _MAIN_RE.pattern.decode(), str(self.root)],
+                capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if proc.returncode > 1:  # 0 = matches, 1 = none, >1 = error
+            return None
+        return {Path(line) for line in proc.stdout.splitlines() if line}
+
+    def _find_python_main_from_list(self, file_paths: List[Path],
+                                    known_files: bool = False) -> List[EntryPoint]:
         """Find Python files with if __name__ == '__main__' from a list."""
-        entries = []
+        candidates = [f for f in file_paths
+                      if f.suffix == '.py'
+                      and self._is_likely_entry_point(f, known_file=known_files)]
+        if not candidates:
+            return []
 
-        for py_file in file_paths:
-            if py_file.suffix != '.py':
-                continue
+        flags = None
+        # For big batches of walk-produced (absolute) paths, let ripgrep
+        # do the content filtering in one subprocess instead of opening
+        # every file from Python
+        if known_files and len(candidates) > 64:
+            hits = self._find_main_files_fast()
+            if hits is not None:
+                flags = [f in hits for f in candidates]
+
+        if flags is None:
+            # The guard check is pure file I/O (the GIL is released during
+            # reads), so fan larger batches out across threads
+            if len(candidates) > 8:
+                workers = min(32, (os.cpu_count() or 4) * 2)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    flags = list(executor.map(self._has_main_guard, candidates))
+            else:
+                flags = [self._has_main_guard(f) for f in candidates]
 
-            if not self._is_likely_entry_point(py_file):
+        entries = []
+        for py_file, has_guard in zip(candidates, flags):
+            if not has_guard:
                 continue
-
             try:
-                content = py_file.read_text(encoding="utf-8", errors="ignore")
-                if re.search(r"if\s+__name__\s*==\s*['\"]__main__['\"]", content):
-                    ep = EntryPoint(
-                        file_path=str(py_file.relative_to(self.root)),
-                        entry_type="main",
-                        command=f"python {py_file.relative_to(self.root)}",
-                        confidence=0.8
-                    )
-                    entries.append(ep)
-            except Exception:
-                pass
+                rel = py_file.relative_to(self.root)
+            except ValueError:
+                continue
+            entries.append(EntryPoint(
+                file_path=str(rel),
+                entry_type="main",
+                command=f"python {rel}",
+                confidence=0.8
+            ))
 
         return entries
 
-    def _is_likely_entry_point(self, path: Path) -> bool:
-        """Check if file looks like an entry point."""
-        if not path.is_file():
+    def _is_likely_entry_point(self, path: Path, known_file: bool = False) -> bool:
+        """Check if file looks like an entry point.
+
+        Args:
+            path: Candidate file path
+            known_file: Skip the is_file() stat when the caller already
+                proved existence (paths coming out of our own walk)
+        """
+        if not known_file and not path.is_file():
             return False
 
-        # Check if path is inside excluded directories
-        try:
-            parts = {p.lower() for p in path.parts}
-        except Exception:
-            parts = set()
-        if parts & {d.lower() for d in self.EXCLUDE_DIRS}:
+        # Check if path is inside excluded directories (covers
+        # __pycache__ too). The leading separator is prepended so
+        # needles also match an excluded first component of a relative
+        # path.
+        low = os.sep + str(path).lower()
+        if self._exclude_re.search(low):
             return False
 
         # Get filename and parent directory for more precise checking
@@ -199,7 +492,7 @@ class EntryPointDetector:
 
         # Skip test files (more precise checking)
         # 1. Files in test directories
-        if parent_dir in ["tests", "test", "__tests__", "spec"]:
+        if parent_dir in self._TEST_DIRS:
             return False
 
         # 2. Files with test patterns in name
@@ -207,17 +500,13 @@ class EntryPointDetector:
             return False
 
         # 3. Example/demo files in example/demo directories
-        if parent_dir in ["examples", "example", "demos", "demo"]:
+        if parent_dir in self._EXAMPLE_DIRS:
             # But allow files that look like entry points in example directories
             # (e.g., example/main.py should still be considered)
-            if filename in ["main.py", "app.py", "server.py", "run.py"]:
+            if filename in self._EXAMPLE_ALLOWED:
                 return True
             return False
 
-        # Skip __pycache__ and other cache directories
-        if "__pycache__" in parts:
-            return False
-
         return True
     
     def _guess_entry_type(self, path: Path) -> str:
@@ -247,29 +536,6 @@ class EntryPointDetector:
             return f"java {path.stem}"
         return None
     
-    def _find_python_main(self) -> List[EntryPoint]:
-        """Find Python files with if __name__ == '__main__'."""
-        entries = []
-        
-        for py_file in self.root.rglob("*.py"):
-            if not self._is_likely_entry_point(py_file):
-                continue
-            
-            try:
-                content = py_file.read_text(encoding="utf-8", errors="ignore")
-                if re.search(r"if\s+__name__\s*==\s*['\"]__main__['\"]", content):
-                    ep = EntryPoint(
-                        file_path=str(py_file.relative_to(self.root)),
-                        entry_type="main",
-                        command=f"python {py_file.relative_to(self.root)}",
-                        confidence=0.8
-                    )
-                    entries.append(ep)
-            except Exception:
-                pass
-        
-        return entries
-    
     def _parse_makefile(self) -> List[str]:
         """Extract targets from Makefile."""
         makefile = self.root / "Makefile"
@@ -278,12 +544,19 @@ class EntryPointDetector:
         
         targets = []
         try:
-            content = makefile.read_text(encoding="utf-8", errors="ignore")
-            for line in content.splitlines():
-                match = re.match(r"^([a-zA-Z0-9_\-]+)\s*:", line)
-                if match:
-                    targets.append(match.group(1))
-        except Exception:
+            # Stream line by line: no full-file string plus a second
+            # splitlines copy
+            with makefile.open("r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    # Cheap first-character screen: a target line must
+                    # start with [a-zA-Z0-9_-], so recipe lines (tab),
+                    # comments, blanks and directives skip the regex
+                    if not line or not (line[0].isalnum() or line[0] in '_-'):
+                        continue
+                    match = _TARGET_RE.match(line)
+                    if match:
+                        targets.append(match.group(1))
+        except OSError:
             pass
         
         return targets
@@ -295,9 +568,11 @@ class EntryPointDetector:
             return {}
         
         try:
-            data = json.loads(pkg_json.read_text(encoding="utf-8"))
+            raw = pkg_json.read_bytes()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
             return data.get("scripts", {})
-        except Exception:
+        except (OSError, ValueError, AttributeError):
+            # unreadable file, malformed JSON, or a non-object document
             return {}
     
     def _parse_dockerfile(self) -> List[str]:
@@ -308,12 +583,12 @@ class EntryPointDetector:
         
         cmds = []
         try:
-            content = dockerfile.read_text(encoding="utf-8", errors="ignore")
-            for line in content.splitlines():
-                line = line.strip()
-                if line.startswith("CMD ") or line.startswith("ENTRYPOINT "):
-                    cmds.append(line)
-        except Exception:
+            with dockerfile.open("r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith(("CMD ", "ENTRYPOINT ")):
+                        cmds.append(line)
+        except OSError:
             pass
         
         return cmds
@@ -333,13 +608,15 @@ class EntryPointDetector:
         if compose.exists():
             try:
                 content = compose.read_text()
-                if "postgres" in content or "mysql" in content or "mongodb" in content:
-                    config.requires_db = True
-                if "redis" in content or "memcached" in content:
-                    config.requires_cache = True
-                if "rabbitmq" in content or "kafka" in content:
-                    config.requires_queue = True
-            except Exception:
+                remaining = {"requires_db", "requires_cache", "requires_queue"}
+                for match in _COMPOSE_SERVICE_RE.finditer(content):
+                    flag = _COMPOSE_SERVICE_FLAGS[match.group()]
+                    if flag in remaining:
+                        setattr(config, flag, True)
+                        remaining.discard(flag)
+                        if not remaining:
+                            break
+            except OSError:
                 pass
     
     def _extract_entry_details(self, entry_points: List[EntryPoint]) -> Dict:
@@ -351,75 +628,108 @@ class EntryPointDetector:
         Returns:
             Dictionary with file processing statistics and details
         """
-        # Try to import tiktoken for accurate token counting
-        try:
-            import tiktoken
-            encoding = tiktoken.get_encoding("cl100k_base")
-            use_tiktoken = True
-        except ImportError:
-            use_tiktoken = False
-            print("[WTFE] Warning: tiktoken not installed, using character-based approximation", file=sys.stderr)
-        
-        # Load config
-        config_path = Path(__file__).parent.parent / 'wtfe_readme' / 'config.yaml'
-        detail_max_tokens = 8000
-        try:
-            import yaml
-            with open(config_path, 'r', encoding='utf-8') as f:
-                cfg = yaml.safe_load(f)
-                detail_max_tokens = cfg.get('detail_max_tokens', 8000)
-        except:
-            pass
-        
+        encoding = _get_tiktoken()
+        use_tiktoken = encoding is not None
+        detail_max_tokens = _get_detail_max_tokens()
+
         files_processed = 0
         files_full_content = 0
         files_downgraded = 0
         total_tokens = 0
         downgraded_tokens = 0
         files_details = []
-        
+
+        # Phase 1: read every file up front, overlapping the reads
+        # across threads (small-file I/O releases the GIL). Items are
+        # (ep, content, prebuilt); prebuilt marks excluded-dir records.
+        items = []
+        to_read = []
         for ep in entry_points:
-            try:
-                file_path = self.root / ep.file_path
-                if not file_path.exists():
-                    continue
+            # No exists() stat here: entry points come from our own
+            # walk, and the open below reports missing files anyway
+            file_path = self.root / ep.file_path
 
-                # Skip reading files that are inside excluded dirs (virtualenv / site-packages / node_modules)
-                try:
-                    fparts = {p.lower() for p in file_path.parts}
-                except Exception:
-                    fparts = set()
-                if fparts & {d.lower() for d in self.EXCLUDE_DIRS}:
-                    files_processed += 1
-                    files_details.append({
-                        "file": ep.file_path,
-                        "mode": "excluded",
-                        "tokens": 0,
-                        "reason": "Excluded directory (virtualenv/vendor)"
-                    })
-                    continue
+            # Skip reading files that are inside excluded dirs (virtualenv / site-packages / node_modules)
+            low = os.sep + str(file_path).lower()
+            if self._exclude_re.search(low):
+                files_processed += 1
+                items.append((ep, None, {
+                    "file": ep.file_path,
+                    "mode": "excluded",
+                    "tokens": 0,
+                    "reason": "Excluded directory (virtualenv/vendor)"
+                }))
+                continue
 
+            items.append((ep, None, None))
+            to_read.append((len(items) - 1, ep, file_path))
+
+        def _read(task):
+            idx, ep, path = task
+            try:
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    return idx, f.read(), None
+            except FileNotFoundError:
+                return idx, None, None
+            except OSError as e:
+                return idx, None, e
+
+        if len(to_read) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(to_read))) as executor:
+                read_results = list(executor.map(_read, to_read))
+        else:
+            read_results = [_read(t) for t in to_read]
+
+        dropped = []
+        for (idx, content, error), (_, ep, _path) in zip(read_results, to_read):
+            if error is not None:
+                print(f"[WTFE] Warning: Failed to process {ep.file_path}: {error}", file=sys.stderr)
+                dropped.append(idx)
+            elif content is None:
+                dropped.append(idx)
+            else:
                 files_processed += 1
+                items[idx] = (ep, content, None)
+        for idx in sorted(dropped, reverse=True):
+            del items[idx]
+
+        # Phase 2: count tokens for all contents in one batched call.
+        # encode_ordinary_batch runs the BPE passes on parallel Rust
+        # threads with the per-call setup paid once (and, unlike encode,
+        # never raises on special-token literals in source files).
+        contents = [c for _, c, _ in items if c is not None]
+        if use_tiktoken and contents:
+            encoded = encoding.encode_ordinary_batch(
+                contents, num_threads=os.cpu_count() or 4)
+            token_counts = iter(len(t) for t in encoded)
+        else:
+            # Approximate: ~4 characters per token
+            token_counts = iter(len(c) // 4 for c in contents)
+
+        # Phase 3: classify and build detail records in input order
+        for ep, content, prebuilt in items:
+            if prebuilt is not None:
+                files_details.append(prebuilt)
+                continue
+            try:
+                tokens = next(token_counts)
 
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                # Count tokens
-                if use_tiktoken:
-                    tokens = len(encoding.encode(content))
-                else:
-                    # Approximate: ~4 characters per token
-                    tokens = len(content) // 4
-                
                 mode = "full"
                 reason = ""
                 if tokens > detail_max_tokens:
-                    # Downgrade to snippet mode
-                    lines = content.split('\n')
-                    if len(lines) > 150:
-                        snippet = '\n'.join(lines[:100] + ['...'] + lines[-50:])
+                    # Downgrade to snippet mode. Bounded split/rsplit pull
+                    # out the head and tail lines without materializing a
+                    # list of every line in a multi-megabyte file.
+                    if content.count('\n') >= 150:
+                        head = content.split('\n', 100)[:100]
+                        tail = content.rsplit('\n', 50)[1:]
+                        snippet = '\n'.join(head + ['...'] + tail)
                         if use_tiktoken:
-                            tokens = len(encoding.encode(snippet))
+                            # Estimate from the full-file token density
+                            # instead of a second BPE pass over the snippet
+                            tokens = min(
+                                tokens,
+                                round(tokens * len(snippet) / len(content)))
                         else:
                             tokens = len(snippet) // 4
                         mode = "snippet"
@@ -432,19 +742,10 @@ class EntryPointDetector:
                     files_full_content += 1
 
                 # Determine content to include in return (respecting size threshold)
-                try:
-                    chars_threshold = int(detail_max_tokens * 4)
-                except Exception:
-                    chars_threshold = detail_max_tokens * 4
+                chars_threshold = int(detail_max_tokens) * 4
 
                 content_for_return = ""
                 if mode == "snippet":
-                    # use snippet variable if created, else create safe snippet
-                    try:
-                        snippet
-                    except NameError:
-                        lines = content.split('\n')
-                        snippet = '\n'.join(lines[:100] + ['...'] + lines[-50:]) if len(lines) > 150 else content
                     content_for_return = snippet[:chars_threshold] + ("\n...TRUNCATED..." if len(snippet) > chars_threshold else "")
                 elif mode == "full":
                     content_for_return = content[:chars_threshold] + ("\n...TRUNCATED..." if len(content) > chars_threshold else "")
@@ -507,7 +808,10 @@ def main():
     if analysis_log:
         result["analysis_log"] = analysis_log
     
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if orjson is not None:
+        print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
 
 
 if __name__ == "__main__":